@@ -1,50 +1,87 @@
 import argparse
-import json
+import asyncio
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
 from langgraph.checkpoint.memory import InMemorySaver
 
-from utlis import build_workflow, create_initial_state
+from utlis import build_workflow, create_initial_state, delete_prompt_cache
 
 
 def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
 
 
 def save_json(path, content):
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(content, f, indent=2, ensure_ascii=False)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(content, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
+def save_state_history(chain, thread_config, path):
+    history = [
+        {
+            "checkpoint_id": snapshot.config["configurable"]["checkpoint_id"],
+            "next": list(snapshot.next),
+            "values": snapshot.values
+        }
+        for snapshot in chain.get_state_history(thread_config)
+    ]
+    save_json(path, history)
 
 
-def run_cli(input_json, current_scenario, new_scenario, result_dir):
+def run_cli(input_json, current_scenario, new_scenario, result_dir, debug=False):
 
     print("Initializing state...")
 
     data = load_json(input_json)
 
-    checkpointer = InMemorySaver()
+    # Per-node checkpoints are only needed to inspect or replay a run
+    checkpointer = InMemorySaver() if debug else None
     chain = build_workflow(checkpoints=checkpointer)
 
     state = create_initial_state(
         current_scenario=current_scenario,
         new_scenario=new_scenario,
-        scenario_json=data
+        scenario_json=data,
+        input_json_path=input_json
     )
 
-    thread_config = {"configurable": {"thread_id": "1"}}
+    # A fresh thread per run; the appended history lists are not reset by the
+    # initial state when a checkpointed thread is reused
+    thread_config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+    # Track the latest state ourselves so it can be saved if a node fails
+    result_state = dict(state)
+
+    async def run_workflow():
+        async for values in chain.astream(state, thread_config, stream_mode="values"):
+            result_state.update(values)
 
     try:
-        result_state = chain.invoke(state, thread_config)
+        asyncio.run(run_workflow())
     except Exception as e:
         print(f"Error: {e}")
         print("The state is saved in:", f"{result_dir}/state.json")
-        temp_state = list(chain.get_state_history(thread_config))[0].values
-        save_json(f"{result_dir}/state.json", temp_state)
+        save_json(f"{result_dir}/state.json", result_state)
         return
-
-    save_json(f"{result_dir}/output.json", result_state["output_json"])
-    save_json(f"{result_dir}/changed_fields.json", result_state["changed_fields"])
+    finally:
+        delete_prompt_cache(result_state["cache_name"])
+        if debug:
+            print("The checkpoint history is saved in:", f"{result_dir}/state_history.json")
+            save_state_history(chain, thread_config, f"{result_dir}/state_history.json")
+
+    # The two result files are independent, so write them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(save_json, f"{result_dir}/output.json", result_state["output_json"]),
+            executor.submit(save_json, f"{result_dir}/changed_fields.json", result_state["changed_fields"])
+        ]
+        for future in futures:
+            future.result()
 
     print("Processing complete.")
     print(f"Results saved in {result_dir}")
@@ -83,13 +120,20 @@ def main():
         help="Directory where results will be saved."
     )
 
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Checkpoint the workflow state after every node and save the history."
+    )
+
     args = parser.parse_args()
 
     run_cli(
         input_json=args.input_json,
         current_scenario=args.current_scenario,
         new_scenario=args.new_scenario,
-        result_dir=args.output_dir
+        result_dir=args.output_dir,
+        debug=args.debug
     )
 
 
@@ -5,36 +5,50 @@ This module implements a LangGraph workflow that adapts existing simulation scen
 to new contexts while preserving JSON structure and internal links.
 """
 
+import asyncio
+import functools
 import json
+import operator
 import os
 import time
-from typing import List
-import copy
+from typing import Annotated, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from genson import SchemaBuilder
 import json_repair
-from jsonschema import validate, ValidationError
+import orjson
+import fastjsonschema
+from google import genai
+from google.genai import types
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict
-from deepdiff import DeepDiff
+import jsonpatch
+import jsonpointer
 
 # Configuration
 
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+MODEL_NAME = "gemini-2.5-flash"
 
+# JSON mode: responses are raw JSON, never wrapped in markdown code blocks
 model = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
+    model=MODEL_NAME,
     api_key=GEMINI_API_KEY,
-    thinking_budget=0
+    thinking_budget=0,
+    response_mime_type="application/json"
 )
 
+# Client used to create Gemini context caches for the stable prompt prefix
+genai_client = genai.Client(api_key=GEMINI_API_KEY)
+
 # Constants
 MAX_RETRIES = 3
-SIMULATION_KEYS_TO_EXTRACT = [
+PROMPT_CACHE_TTL = "600s"
+# Tuple keeps the prompt key order stable across runs (a set would not)
+SIMULATION_KEYS_TO_EXTRACT = (
     'lessonInformation',
     'assessmentCriterion',
     'selectedAssessmentCriterion',
@@ -42,7 +56,7 @@ SIMULATION_KEYS_TO_EXTRACT = [
     'workplaceScenario',
     'industryAlignedActivities',
     'selectedIndustryAlignedActivities'
-]
+)
 
 # Helper
 def sanitize(obj):
@@ -67,9 +81,10 @@ class State(TypedDict):
     current_scenario_option: str
     new_scenario_option: str
     current_scenario_example_json: dict
+    input_json_path: str
     
-    # Validation schema
-    validation_schema: dict
+    # Gemini context cache holding the stable prompt prefix
+    cache_name: str
     
     # Generated outputs
     generated_schema: str
@@ -79,10 +94,12 @@ class State(TypedDict):
     evaluator_message: str
     num_retries: int
     
-    # History tracking
-    history_generator: List[str]
-    history_evaluator: List[str]
-    message_history: List[dict]
+    # History tracking (nodes return only new entries, LangGraph appends them).
+    # The initial [] does not reset these on a checkpointed thread, so each run
+    # needs its own thread_id
+    history_generator: Annotated[List[str], operator.add]
+    history_evaluator: Annotated[List[str], operator.add]
+    message_history: Annotated[List[dict], operator.add]
     
     # Timing metrics
     simulation_start_time: float
@@ -92,13 +109,13 @@ class State(TypedDict):
     # Final status
     schema_fidelity: str
     locked_field_equality: str
-    changed_fields: List[str]
+    changed_fields: dict
     output_json: dict
 
 # Initialize State
 
 def create_initial_state(current_scenario: str, new_scenario: str, 
-                        scenario_json: dict) -> dict:
+                        scenario_json: dict, input_json_path: str) -> dict:
     """
     Creates an initial state dictionary for the workflow.
     
@@ -106,7 +123,8 @@ def create_initial_state(current_scenario: str, new_scenario: str,
         current_scenario: Description of the current simulation scenario
         new_scenario: Description of the target scenario
         scenario_json: The complete simulation JSON to be recontextualized
-        validation_schema: JSON schema for validation
+        input_json_path: Path of the file scenario_json was loaded from; the
+            validation schemas are built from and cached against this file
         
     Returns:
         Dictionary with initialized state values
@@ -115,6 +133,7 @@ def create_initial_state(current_scenario: str, new_scenario: str,
         'current_scenario_option': current_scenario,
         'new_scenario_option': new_scenario,
         'current_scenario_example_json': scenario_json,
+        'input_json_path': input_json_path,
         'generated_schema': '',
         'generated_schema_simulation_flow': '',
         'evaluator_message': '',
@@ -122,6 +141,7 @@ def create_initial_state(current_scenario: str, new_scenario: str,
         'history_generator': [],
         'history_evaluator': [],
         'message_history': [],
+        'cache_name': '',
         'simulation_start_time': 0.0,
         'simulation_end_time': 0.0,
         'simulation_duration': 0.0,
@@ -131,7 +151,7 @@ def create_initial_state(current_scenario: str, new_scenario: str,
 # Agent Functions
 
 
-def recontextualize_except_simulation_flow_agent(state: State) -> dict:
+async def recontextualize_except_simulation_flow_agent(state: State) -> dict:
     """
     First agent: Recontextualizes all simulation data except the simulationFlow section.
     
@@ -158,29 +178,41 @@ def recontextualize_except_simulation_flow_agent(state: State) -> dict:
         SIMULATION_KEYS_TO_EXTRACT
     )
     
-    builder = SchemaBuilder()
-    builder.add_object(simulation_json)
-    validation_schema = builder.to_schema()
-    
-    # Build the prompt
-    prompt = _build_recontextualization_prompt(
+    # Cache the stable prefix (instructions + simulation JSON) so retries only send the delta
+    prefix = _stable_prefix(
         old_scenario=state['current_scenario_option'],
-        new_scenario=state['new_scenario_option'],
         simulation_json=simulation_json
     )
+    suffix = _variable_suffix(new_scenario=state['new_scenario_option'])
     
-    # Update message history and get response
-    updated_history = state['message_history'] + [{"role": "user", "content": prompt}]
-    response = model.invoke(updated_history)
+    async def generate():
+        cache_name = await _create_prompt_cache(prefix)
+        prompt = suffix if cache_name else prefix + suffix
+        
+        # Update message history and get response
+        user_message = {"role": "user", "content": prompt}
+        try:
+            response = await model.ainvoke([user_message], cached_content=cache_name or None)
+        except Exception:
+            # The cache name never reaches the state, so the caller cannot delete it
+            delete_prompt_cache(cache_name)
+            raise
+        return cache_name, user_message, response
+    
+    # The validators do not depend on the response, so compile them while the model runs
+    _, (cache_name, user_message, response) = await asyncio.gather(
+        asyncio.to_thread(_prepare_validation, state['input_json_path']),
+        generate()
+    )
     
     print(f"✓ Recontextualization completed in {time.time() - simulation_start_time:.2f} seconds")
     
     return {
-        'validation_schema': validation_schema,
+        'cache_name': cache_name,
         'simulation_start_time': simulation_start_time,
-        'message_history': updated_history + [{"role": "assistant", "content": response.content}],
+        'message_history': [user_message, {"role": "assistant", "content": response.content}],
         'generated_schema': response.content,
-        'history_generator': state['history_generator'] + [response.content]
+        'history_generator': [response.content]
     }
 
 
@@ -198,25 +230,29 @@ def validate_json(state: State) -> dict:
     print("Validating JSON schema...")
     
     try:
-        # Clean and parse the generated JSON
-        cleaned_json_text = _remove_markdown_code_blocks(state['generated_schema'])
-        generated_json = json.loads(cleaned_json_text)
+        # Parse strictly so malformed or truncated output is retried, not repaired
+        generated_json = orjson.loads(state['generated_schema'])
         
         # Validate against schema
-        validate(instance=generated_json, schema=state['validation_schema'])
+        validator = _validator_for(
+            state['input_json_path'],
+            os.path.getmtime(state['input_json_path']),
+            SIMULATION_KEYS_TO_EXTRACT
+        )
+        validator(generated_json)
         
         print("✓ JSON Schema Validation OK")
         return {
             'evaluator_message': 'PASS',
-            'history_evaluator': state['history_evaluator'] + ['PASS']
+            'history_evaluator': ['PASS']
         }
         
-    except ValidationError as e:
+    except fastjsonschema.JsonSchemaValueException as e:
         print(f"✗ JSON Schema Validation FAILED: {e.message}")
         return {
             'num_retries': state['num_retries'] + 1,
             'evaluator_message': f"JSON Schema Validation FAILED: {e.message}",
-            'history_evaluator': state['history_evaluator'] + [e.message]
+            'history_evaluator': [e.message]
         }
         
     except json.JSONDecodeError as e:
@@ -224,7 +260,7 @@ def validate_json(state: State) -> dict:
         return {
             'num_retries': state['num_retries'] + 1,
             'evaluator_message': f"JSON Parse Error: {str(e)}",
-            'history_evaluator': state['history_evaluator'] + [str(e)]
+            'history_evaluator': [str(e)]
         }
 
 
@@ -241,21 +277,52 @@ def json_format_correction_agent(state: State) -> dict:
     
     print(f"Retry number: {state['num_retries']} || Attempting JSON format correction...")
     
-    retry_prompt = _build_correction_prompt(state['evaluator_message'])
+    # Send the failing candidate, the error, the target scenario and its constraints;
+    # the instructions and simulation JSON come from the cached prefix, or are resent
+    # if there is none
+    candidate_json = _parse_model_json(state['generated_schema'])
+    retry_prompt = ''.join([
+        _variable_suffix(state['new_scenario_option'], deliverable=False),
+        '\n\n',
+        _build_correction_prompt(state['evaluator_message'], candidate_json)
+    ])
+    if not state['cache_name']:
+        simulation_json = _extract_simulation_subset(
+            state['current_scenario_example_json'],
+            SIMULATION_KEYS_TO_EXTRACT
+        )
+        retry_prompt = _stable_prefix(state['current_scenario_option'], simulation_json) + retry_prompt
     
     response = model.invoke(
-        state['message_history'] + [{"role": "user", "content": retry_prompt}]
+        [{"role": "user", "content": retry_prompt}],
+        cached_content=state['cache_name'] or None
     )
     
+    # The model answers with a JSON Patch, which is applied locally; a whole
+    # object is taken as a full replacement
+    try:
+        response_json = _parse_model_json(response.content)
+        if isinstance(response_json, dict):
+            print("✗ Correction returned a full JSON object instead of a JSON Patch, using it as a replacement")
+            corrected_json = response_json
+        elif isinstance(response_json, list):
+            corrected_json = jsonpatch.apply_patch(candidate_json, response_json)
+        else:
+            raise jsonpatch.InvalidJsonPatch("Expected a JSON Patch array or a JSON object")
+        generated_schema = orjson.dumps(corrected_json).decode()
+    except (jsonpatch.JsonPatchException, jsonpointer.JsonPointerException) as e:
+        print(f"✗ Correction patch could not be applied: {str(e)}")
+        generated_schema = state['generated_schema']
+    
     print(f'finished JSON format correction attempt')
     
     return {
-        'message_history': state['message_history'] + [
+        'message_history': [
             {"role": "user", "content": retry_prompt},
             {"role": "assistant", "content": response.content}
         ],
-        'generated_schema': response.content,
-        'history_generator': state['history_generator'] + [response.content]
+        'generated_schema': generated_schema,
+        'history_generator': [response.content]
     }
 
 
@@ -287,7 +354,7 @@ def recontextualize_simulation_flow_agent(state: State) -> dict:
     
     # Attempt to parse and validate the JSON
     
-    generated_schema_simulation_flow = json_repair.loads(response.content)
+    generated_schema_simulation_flow = _parse_model_json(response.content)
     
     print(f"✓ Recontextualization completed in {time.time() - start_time:.2f} seconds")
     
@@ -328,54 +395,52 @@ def aggregator_node(state:State):
     
     start_time = time.time()
     
-    with open("problem_statement/POC_sim_D.json", "r") as f:
-        data = json.load(f)
+    data = state['current_scenario_example_json']
 
-    recontextualized_json = copy.deepcopy(data)
+    # Generated keys are overwritten wholesale, so only the containers need copying
+    recontextualized_json = {**data, 'topicWizardData': {**data['topicWizardData']}}
 
-    state['generated_schema'] = json_repair.loads(state['generated_schema'])
+    state['generated_schema'] = _parse_model_json(state['generated_schema'])
 
+    # The input was decoded from a UTF-8 file; only model output needs sanitizing
     for key, value in state['generated_schema'].items():
-        recontextualized_json['topicWizardData'][key] = value
+        recontextualized_json['topicWizardData'][key] = sanitize(value)
         
-    recontextualized_json['topicWizardData']['simulationFlow'] = state['generated_schema_simulation_flow']
+    recontextualized_json['topicWizardData']['simulationFlow'] = sanitize(state['generated_schema_simulation_flow'])
 
-    recontextualized_json['topicWizardData']['selectedScenarioOption'] = state['new_scenario_option']
+    recontextualized_json['topicWizardData']['selectedScenarioOption'] = sanitize(state['new_scenario_option'])
     
-    safe_data = sanitize(data)
-    safe_recontextualized_json = sanitize(recontextualized_json)
+    changed_keys = list(state['generated_schema']) + ['simulationFlow', 'selectedScenarioOption']
 
 
     try:
-        diff = DeepDiff(
-                            safe_data,
-                            safe_recontextualized_json,
-                            ignore_order=True,
-                            report_repetition=True,
-                            hasher=None  # prevents hashing
-                        )
-
+        diff = _diff_changed_fields(
+            data['topicWizardData'],
+            recontextualized_json['topicWizardData'],
+            changed_keys
+        )
     except Exception as e:
         diff={}
-        print(f"✗ Aggregator Node: Error in DeepDiff. The Change Log Could not be generated. \n {str(e)}")
+        print(f"✗ Aggregator Node: Error in JSON Patch diff. The Change Log Could not be generated. \n {str(e)}")
         
     simulation_end_time = time.time()
     simulation_duration = simulation_end_time - state['simulation_start_time']
 
-    builder = SchemaBuilder()
-    builder.add_object(data)
-    validation_schema = builder.to_schema()
+    validator = _validator_for(state['input_json_path'], os.path.getmtime(state['input_json_path']))
 
     try:
-        validate(instance=recontextualized_json, schema=validation_schema)
+        validator(recontextualized_json)
         schema_fidelity='PASS'
         print("JSON conforms to the schema:")
-    except ValidationError as e:
+    except fastjsonschema.JsonSchemaValueException as e:
         print("JSON does not conform to the schema:")
         print(e)
         schema_fidelity='FAIL'
         
-    if recontextualized_json['topicWizardData']['scenarioOptions'] == data['topicWizardData']['scenarioOptions']: 
+    # The locked field is shared with the input unless the model output overwrote it
+    locked_value = recontextualized_json['topicWizardData']['scenarioOptions']
+    original_value = data['topicWizardData']['scenarioOptions']
+    if locked_value is original_value or locked_value == original_value:
         locked_field_equality='PASS'
     else:
         locked_field_equality='FAIL'
@@ -391,7 +456,7 @@ def aggregator_node(state:State):
     return {
         'schema_fidelity':schema_fidelity,
         'locked_field_equality':locked_field_equality,
-        'output_json': safe_recontextualized_json,
+        'output_json': recontextualized_json,
         'simulation_end_time': simulation_end_time,
         'simulation_duration': simulation_duration,
         'changed_fields': diff
@@ -403,78 +468,219 @@ def aggregator_node(state:State):
 # Helper Functions
 
 
-def _extract_simulation_subset(full_json: dict, keys_to_extract: List[str]) -> dict:
+def _extract_simulation_subset(full_json: dict, keys_to_extract: Tuple[str, ...]) -> dict:
     """
     Extracts a subset of keys from the simulation JSON.
     
     Args:
         full_json: Complete simulation JSON
-        keys_to_extract: List of keys to extract
+        keys_to_extract: Keys to extract
         
     Returns:
         Dictionary containing only the specified keys
     """
     topic_wizard_data = full_json.get('topicWizardData', {})
-    return {k: v for k, v in topic_wizard_data.items() if k in keys_to_extract}
+    return {k: topic_wizard_data[k] for k in keys_to_extract if k in topic_wizard_data}
+
+
+def _prepare_validation(path: str) -> None:
+    """
+    Compiles the validators used by validate_json and aggregator_node, so
+    neither compiles on its own critical path.
+    
+    Args:
+        path: Path to the simulation JSON file
+    """
+    mtime = os.path.getmtime(path)
+    _validator_for(path, mtime, SIMULATION_KEYS_TO_EXTRACT)
+    _validator_for(path, mtime)
+
+
+@functools.lru_cache(maxsize=32)
+def _schema_for(path: str, mtime: float) -> dict:
+    """
+    Builds the GenSON schema of a simulation JSON file, cached per file version.
+    
+    Args:
+        path: Path to the simulation JSON file
+        mtime: Modification time of the file, so edits invalidate the cache
+        
+    Returns:
+        JSON schema describing the file (shared, must not be mutated)
+    """
+    with open(path, "rb") as f:
+        data = orjson.loads(f.read())
+    
+    builder = SchemaBuilder()
+    builder.add_object(data)
+    return builder.to_schema()
+
+
+def _project_schema(full_schema: dict, keys: Tuple[str, ...]) -> dict:
+    """
+    Restricts a full simulation schema to the given topicWizardData keys.
+    
+    Args:
+        full_schema: Schema of the complete simulation JSON
+        keys: topicWizardData keys to keep
+        
+    Returns:
+        Schema matching the output of _extract_simulation_subset
+    """
+    topic_wizard_schema = full_schema['properties']['topicWizardData']
+    properties = topic_wizard_schema['properties']
+    return {
+        '$schema': full_schema['$schema'],
+        'type': 'object',
+        'properties': {k: properties[k] for k in keys if k in properties},
+        'required': [k for k in topic_wizard_schema.get('required', []) if k in keys]
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _validator_for(path: str, mtime: float, keys: Optional[Tuple[str, ...]] = None):
+    """
+    Compiles a fastjsonschema validator for a simulation JSON file, once per file version.
+    
+    Args:
+        path: Path to the simulation JSON file
+        mtime: Modification time of the file, so edits invalidate the cache
+        keys: Optional topicWizardData keys to restrict the schema to
+        
+    Returns:
+        Callable that raises JsonSchemaValueException on invalid input
+    """
+    schema = _schema_for(path, mtime)
+    if keys is not None:
+        schema = _project_schema(schema, keys)
+    return fastjsonschema.compile(schema)
+
+
+def _diff_changed_fields(original: dict, updated: dict, keys: List[str]) -> dict:
+    """
+    Builds a JSON Patch change log for the recontextualized keys only.
+    
+    Args:
+        original: topicWizardData of the input simulation JSON
+        updated: topicWizardData of the recontextualized simulation JSON
+        keys: Keys that were overwritten during aggregation
+        
+    Returns:
+        Dictionary mapping each changed key to its list of JSON Patch operations
+    """
+    diffs = {}
+    for key in keys:
+        # The C-level != stops at the first difference, while make_patch walks
+        # equal subtrees in Python; only build a patch for keys that differ
+        if original.get(key) != updated[key]:
+            diffs[key] = jsonpatch.make_patch(original.get(key), updated[key]).patch
+    return diffs
 
 
-def _remove_markdown_code_blocks(text: str) -> str:
+def _parse_model_json(text: str):
     """
-    Removes markdown code block markers from text.
+    Parses a model response into JSON, trying the fast parser first.
     
     Args:
-        text: Text potentially containing markdown code blocks
+        text: Raw model response (JSON mode, so no markdown code blocks)
         
     Returns:
-        Cleaned text without code block markers
+        Parsed JSON value
     """
-    text = text.strip()
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # Fall back to the tolerant (and much slower) parser, e.g. for truncated output
+        return json_repair.loads(text)
+
+
+async def _create_prompt_cache(prefix: str) -> str:
+    """
+    Stores the stable prompt prefix in a Gemini context cache.
     
-    if text.startswith('```'):
-        first_newline = text.find('\n')
-        last_backticks = text.rfind('```')
+    Args:
+        prefix: Prompt text shared by the initial request and every retry
         
-        if first_newline != -1 and last_backticks != -1:
-            return text[first_newline + 1:last_backticks].strip()
+    Returns:
+        Name of the created cache, or an empty string if caching is unavailable
+        (e.g. the prefix is below the model's minimum cacheable token count)
+    """
+    try:
+        cache = await genai_client.aio.caches.create(
+            model=MODEL_NAME,
+            config=types.CreateCachedContentConfig(
+                contents=[prefix],
+                ttl=PROMPT_CACHE_TTL
+            )
+        )
+        return cache.name
+    except Exception as e:
+        print(f"✗ Prompt cache could not be created, sending the full prompt instead. \n {str(e)}")
+        return ''
+
+
+def delete_prompt_cache(cache_name: str) -> None:
+    """
+    Deletes the Gemini context cache created for this run, if any.
+    
+    Called by the runner once the workflow has finished or failed, so the cache
+    is not billed until its TTL runs out.
     
-    return text
+    Args:
+        cache_name: Name returned by _create_prompt_cache (state['cache_name'])
+    """
+    if not cache_name:
+        return
+    
+    try:
+        genai_client.caches.delete(name=cache_name)
+    except Exception as e:
+        print(f"✗ Prompt cache {cache_name} could not be deleted, it expires after {PROMPT_CACHE_TTL}. \n {str(e)}")
+
 
+# Prompt Templates
 
-def _build_recontextualization_prompt(old_scenario: str, new_scenario: str, simulation_json: dict) -> str:
-    """Builds the prompt for the initial recontextualization."""
-    return f'''You are an expert simulation designer. Your task is to adapt an existing simulation (given as JSON) to a new scenario while preserving its structure and links.
+
+RECONTEXTUALIZATION_PROMPT_HEAD = '''You are an expert simulation designer. Your task is to adapt an existing simulation (given as JSON) to a new scenario while preserving its structure and links.
 
 Here is the current simulation scenario:
-OLD SCENARIO: {old_scenario}
+OLD SCENARIO: '''
+RECONTEXTUALIZATION_PROMPT_SIMULATION = '''
 
 Simulation JSON (do not modify the structure or fields):
-SIMULATION: {json.dumps(simulation_json, indent=2)}
+SIMULATION: '''
+RECONTEXTUALIZATION_PROMPT_PREFIX_END = '''
 
-Your objective:
+'''
+RECONTEXTUALIZATION_PROMPT_OBJECTIVE = '''Your objective:
 - Re-contextualize all narrative, descriptions, and scenario-dependent content so that it aligns with the NEW SCENARIO:
-NEW SCENARIO: {new_scenario}
+NEW SCENARIO: '''
+RECONTEXTUALIZATION_PROMPT_CONSTRAINTS = '''
 
 Constraints:
 1. Do not modify the JSON structure, keys, or data types.
 2. Locked fields (everything not scenario-dependent) must remain identical.
 3. Only adapt scenario-relevant content such as names, roles, narrative, instructions, examples, and context.
 4. Ensure global coherence: the adapted simulation should read naturally, reflect the new scenario consistently, and contain no residual references to the old scenario.
-5. Preserve formatting, arrays, objects, and any schema constraints.
+5. Preserve formatting, arrays, objects, and any schema constraints.'''
+RECONTEXTUALIZATION_PROMPT_DELIVERABLE = '''
 
 Deliverable:
 - Output ONLY the valid JSON object. Do not include any markdown formatting, code blocks, explanations, or additional text.
 - Do not wrap the JSON in ```json or ``` markers.
 - Return only the raw JSON that can be directly parsed.'''
 
-
-def _build_correction_prompt(error_message: str) -> str:
-    """Builds the prompt for JSON correction after validation failure."""
-    return f'''The previous output did not satisfy the required JSON Schema.
+CORRECTION_PROMPT_HEAD = '''The previous output did not satisfy the required JSON Schema.
 A validation failure occurred with the following message:
 
-{error_message}
+'''
+CORRECTION_PROMPT_PREVIOUS_OUTPUT = '''
 
-You must correct all issues identified by the validator and produce a fully compliant JSON object.
+Here is the previous output:
+'''
+CORRECTION_PROMPT_TAIL = '''
+
+You must correct all issues identified by the validator so that the JSON object becomes fully compliant.
 Carefully review the schema constraints, adjust any incorrect fields or structural inconsistencies, and ensure that:
 
 1. Every key strictly adheres to the expected schema.
@@ -483,25 +689,27 @@ Carefully review the schema constraints, adjust any incorrect fields or structur
 4. Arrays and nested objects follow the exact structure defined by the schema.
 5. The JSON remains syntactically valid and properly formatted.
 
-After making the necessary corrections, re-generate the complete JSON output that fully conforms to the schema.
-Provide only the corrected JSON in your response.'''
+Do not re-generate the complete JSON. Instead, respond with a JSON Patch (RFC 6902) array of operations that fixes the previous output, for example:
+[{"op": "add", "path": "/simulationName", "value": "..."}]
+If the previous output cannot be repaired, use a single "replace" operation with path "" and the complete corrected JSON as its value.
+Provide only the JSON Patch array in your response.'''
 
-
-def _build_simulation_flow_prompt(current_scenario: str, new_scenario: str, 
-                                  simulation_flow: dict, additional_context: str) -> str:
-    """Builds the prompt for recontextualizing the simulation flow."""
-    return f'''You are an expert simulation designer. Your task is to adapt an existing simulation (provided as JSON) to a new scenario while preserving its structure and internal links.
+SIMULATION_FLOW_PROMPT_HEAD = '''You are an expert simulation designer. Your task is to adapt an existing simulation (provided as JSON) to a new scenario while preserving its structure and internal links.
 
 Here is the scenario:
-CURRENT SCENARIO: {current_scenario}
+CURRENT SCENARIO: '''
+SIMULATION_FLOW_PROMPT_SCHEMA = '''
 
 Simulation JSON (do not modify the structure or fields):
-SIMULATION SCHEMA: {json.dumps(simulation_flow, indent=2)}
+SIMULATION SCHEMA: '''
+SIMULATION_FLOW_PROMPT_NEW_SCENARIO = '''
 
 Your objective:
 - Re-contextualize all narrative, descriptions, and scenario-dependent content so that it aligns with the NEW SCENARIO.
-NEW SCENARIO: {new_scenario}
-ADDITIONAL CONTEXT FOR THE NEW SCENARIO: {additional_context}
+NEW SCENARIO: '''
+SIMULATION_FLOW_PROMPT_CONTEXT = '''
+ADDITIONAL CONTEXT FOR THE NEW SCENARIO: '''
+SIMULATION_FLOW_PROMPT_TAIL = '''
 
 Constraints:
 1. Do not modify the JSON structure, keys, or data types.
@@ -518,6 +726,51 @@ Deliverable:
 - Return only the raw JSON that can be directly parsed.'''
 
 
+def _stable_prefix(old_scenario: str, simulation_json: dict) -> str:
+    """Builds the cacheable part of the recontextualization prompt."""
+    return ''.join([
+        RECONTEXTUALIZATION_PROMPT_HEAD, old_scenario,
+        RECONTEXTUALIZATION_PROMPT_SIMULATION, orjson.dumps(simulation_json).decode(),
+        RECONTEXTUALIZATION_PROMPT_PREFIX_END
+    ])
+
+
+def _variable_suffix(new_scenario: str, deliverable: bool = True) -> str:
+    """
+    Builds the scenario-specific part of the recontextualization prompt.
+    
+    Args:
+        new_scenario: Target scenario description
+        deliverable: Whether to ask for the complete JSON object; correction
+            retries leave it out because they ask for a JSON Patch instead
+    """
+    parts = [RECONTEXTUALIZATION_PROMPT_OBJECTIVE, new_scenario, RECONTEXTUALIZATION_PROMPT_CONSTRAINTS]
+    if deliverable:
+        parts.append(RECONTEXTUALIZATION_PROMPT_DELIVERABLE)
+    return ''.join(parts)
+
+
+def _build_correction_prompt(error_message: str, candidate_json) -> str:
+    """Builds the prompt for JSON correction after validation failure."""
+    return ''.join([
+        CORRECTION_PROMPT_HEAD, error_message,
+        CORRECTION_PROMPT_PREVIOUS_OUTPUT, orjson.dumps(candidate_json).decode(),
+        CORRECTION_PROMPT_TAIL
+    ])
+
+
+def _build_simulation_flow_prompt(current_scenario: str, new_scenario: str, 
+                                  simulation_flow: dict, additional_context: str) -> str:
+    """Builds the prompt for recontextualizing the simulation flow."""
+    return ''.join([
+        SIMULATION_FLOW_PROMPT_HEAD, current_scenario,
+        SIMULATION_FLOW_PROMPT_SCHEMA, orjson.dumps(simulation_flow).decode(),
+        SIMULATION_FLOW_PROMPT_NEW_SCENARIO, new_scenario,
+        SIMULATION_FLOW_PROMPT_CONTEXT, additional_context,
+        SIMULATION_FLOW_PROMPT_TAIL
+    ])
+
+
 
 # Workflow Construction
 